@@ -1,11 +1,26 @@
 // ignore_for_file: deprecated_member_use
 
+import 'package:flutter/foundation.dart' show kIsWeb;
 import 'package:flutter/material.dart';
+import 'dart:async';
+import 'dart:io' show Platform;
+import 'dart:isolate';
 import 'dart:math';
 import 'dart:convert';
-import 'package:http/http.dart' as http; // REQUIRED FOR API
+import 'dart:typed_data';
+import 'package:http/http.dart' deferred as http; // REQUIRED FOR API (loaded on first fetch)
+import 'package:sqflite/sqflite.dart'; // REQUIRED FOR LEDGER (Android / iOS / macOS)
+import 'package:sqflite_common_ffi/sqflite_ffi.dart' show sqfliteFfiInit, databaseFactoryFfi; // LEDGER ON LINUX / WINDOWS
+import 'package:sqflite_common_ffi_web/sqflite_ffi_web.dart' show databaseFactoryFfiWeb; // LEDGER ON WEB (run `dart run sqflite_common_ffi_web:setup` once)
+
+// PUB DEPENDENCIES: http, sqflite, sqflite_common_ffi, sqflite_common_ffi_web
+
+// Time from launch to first frame; anything over budget is logged.
+const Duration kStartupBudget = Duration(milliseconds: 1500);
+final Stopwatch _launchClock = Stopwatch();
 
 void main() {
+  _launchClock.start();
   runApp(const QuantParlayEngineApp());
 }
 
@@ -52,6 +67,7 @@ class Leg {
   double oddsAmerican;
   double confidence; // 1-10
   bool active;
+  String eventDate; // YYYY-MM-DD of the game, '' if unknown
 
   Leg({
     required this.id,
@@ -61,6 +77,7 @@ class Leg {
     this.oddsAmerican = -110,
     this.confidence = 5,
     this.active = true,
+    this.eventDate = '',
   });
 
   double get decimalOdds {
@@ -73,7 +90,7 @@ class Leg {
   double get myProb => confidence * 0.10;
 
   String toCsvString() {
-    return "$name,$oddsAmerican,$confidence,$exclGroup,$linkGroup,$active";
+    return "$name,$oddsAmerican,$confidence,$exclGroup,$linkGroup,$active,$eventDate";
   }
 
   factory Leg.fromCsvString(String csv) {
@@ -87,6 +104,7 @@ class Leg {
       exclGroup: parts.length > 3 ? parts[3] : '',
       linkGroup: parts.length > 4 ? parts[4] : '',
       active: parts.length > 5 ? parts[5].toLowerCase() == 'true' : true,
+      eventDate: parts.length > 6 ? parts[6] : '',
     );
   }
 }
@@ -100,6 +118,7 @@ class GeneratedParlay {
   double ev;
   bool isCorrelated;
   bool betPlaced;
+  int? ledgerId; // Set once written to the ledger
 
   GeneratedParlay({
     required this.legs,
@@ -120,6 +139,1115 @@ class GeneratedParlay {
   double get potentialPayout => (myWager * totalOddsDec) - myWager;
 }
 
+// --- LEDGER MODELS ---
+class LedgerBucket {
+  String key; // Day (YYYY-MM-DD) or week start (Monday)
+  int bets;
+  int settled;
+  double wagered;
+  double settledWagered;
+  double pnl;
+
+  LedgerBucket({this.key = '', this.bets = 0, this.settled = 0, this.wagered = 0, this.settledWagered = 0, this.pnl = 0});
+
+  factory LedgerBucket.fromRow(Map<String, Object?> row) {
+    return LedgerBucket(
+      key: (row['bucket'] as String?) ?? '',
+      bets: ((row['bets'] as num?) ?? 0).toInt(),
+      settled: ((row['settled'] as num?) ?? 0).toInt(),
+      wagered: ((row['wagered'] as num?) ?? 0).toDouble(),
+      settledWagered: ((row['settled_wagered'] as num?) ?? 0).toDouble(),
+      pnl: ((row['pnl'] as num?) ?? 0).toDouble(),
+    );
+  }
+
+  double get openRisk => wagered - settledWagered;
+  double get roi => settledWagered > 0 ? (pnl / settledWagered) * 100 : 0;
+}
+
+class LegResult {
+  final String key; // Leg id, or leg name when [eventDate] is given
+  final String? eventDate;
+  final bool won;
+
+  const LegResult({required this.key, this.eventDate, required this.won});
+}
+
+class LedgerSettlement {
+  int legsGraded = 0;
+  int betsClosed = 0;
+  List<LegResult> unmatched = []; // Lines that matched no pending leg
+}
+
+class LegExposure {
+  String legName;
+  int openBets;
+  double openRisk;
+
+  LegExposure({required this.legName, required this.openBets, required this.openRisk});
+}
+
+// --- LEDGER STORE (SQLite / WAL) ---
+// Bets and their legs are only ever appended; settlement flips their status once.
+// Daily/weekly buckets and per-leg exposure are maintained in the same transaction,
+// so reports read a handful of pre-aggregated rows instead of scanning every bet.
+class BetLedger {
+  static const int _pending = 0;
+  static const int _won = 1;
+  static const int _lost = 2;
+  static const int _chunkSize = 400; // Stay under SQLite's bound-variable limit (999)
+
+  Database? _db;
+
+  bool get isOpen => _db != null;
+  Database get _database => _db ?? (throw StateError("Ledger is not open"));
+
+  // sqflite only ships mobile/macOS plugins; desktop uses the FFI build and the browser
+  // the wasm build (IndexedDB-backed, no WAL).
+  static DatabaseFactory _factoryForPlatform() {
+    if (kIsWeb) return databaseFactoryFfiWeb;
+    if (Platform.isLinux || Platform.isWindows) {
+      sqfliteFfiInit();
+      return databaseFactoryFfi;
+    }
+    return databaseFactory;
+  }
+
+  Future<void> open() async {
+    if (_db != null) return;
+    final factory = _factoryForPlatform();
+    final dir = kIsWeb ? '' : "${await factory.getDatabasesPath()}/";
+    _db = await factory.openDatabase("${dir}parlay_ledger.db", options: OpenDatabaseOptions(
+      version: 1,
+      onConfigure: (db) async {
+        if (kIsWeb) return;
+        await db.rawQuery('PRAGMA journal_mode=WAL');
+        await db.execute('PRAGMA synchronous=NORMAL');
+      },
+      onCreate: (db, version) async {
+        await db.execute('CREATE TABLE bets (id INTEGER PRIMARY KEY AUTOINCREMENT, placed_at INTEGER NOT NULL, day TEXT NOT NULL, week TEXT NOT NULL, odds_dec REAL NOT NULL, wager REAL NOT NULL, status INTEGER NOT NULL DEFAULT 0, settled_at INTEGER, pnl REAL)');
+        await db.execute('CREATE TABLE bet_legs (bet_id INTEGER NOT NULL, leg_id TEXT NOT NULL, leg_name TEXT NOT NULL, event_date TEXT NOT NULL, odds_american REAL NOT NULL, confidence REAL NOT NULL, status INTEGER NOT NULL DEFAULT 0)');
+        await db.execute('CREATE INDEX idx_bet_legs_pending ON bet_legs(leg_name, event_date, status)');
+        await db.execute('CREATE INDEX idx_bet_legs_pending_id ON bet_legs(leg_id, status)');
+        await db.execute('CREATE INDEX idx_bet_legs_bet ON bet_legs(bet_id)');
+        for (var table in ['agg_daily', 'agg_weekly']) {
+          await db.execute('CREATE TABLE $table (bucket TEXT PRIMARY KEY, bets INTEGER NOT NULL DEFAULT 0, settled INTEGER NOT NULL DEFAULT 0, wagered REAL NOT NULL DEFAULT 0, settled_wagered REAL NOT NULL DEFAULT 0, pnl REAL NOT NULL DEFAULT 0)');
+        }
+        await db.execute('CREATE TABLE leg_exposure (leg_name TEXT PRIMARY KEY, open_bets INTEGER NOT NULL DEFAULT 0, open_risk REAL NOT NULL DEFAULT 0)');
+      },
+    ));
+  }
+
+  static String dayKey(DateTime t) => "${t.year.toString().padLeft(4, '0')}-${t.month.toString().padLeft(2, '0')}-${t.day.toString().padLeft(2, '0')}";
+  static String weekKey(DateTime t) => dayKey(DateTime(t.year, t.month, t.day - (t.weekday - DateTime.monday)));
+
+  // Aug 1 covers the NFL/NBA/NHL/NCAAB season starts.
+  static String seasonStartKey(DateTime t) => dayKey(DateTime(t.month >= 8 ? t.year : t.year - 1, 8, 1));
+
+  static String _marks(int n) => List.filled(n, '?').join(',');
+
+  static Iterable<List<T>> _chunks<T>(List<T> items) sync* {
+    for (int i = 0; i < items.length; i += _chunkSize) {
+      yield items.sublist(i, min(i + _chunkSize, items.length));
+    }
+  }
+
+  /// Appends placed parlays and their legs. Returns the new ledger ids in input order.
+  Future<List<int>> logBets(List<GeneratedParlay> bets, {DateTime? at}) async {
+    final now = at ?? DateTime.now();
+    final day = dayKey(now);
+    final week = weekKey(now);
+
+    return _database.transaction((txn) async {
+      List<int> ids = [];
+      double wagered = 0;
+      Map<String, List<double>> exposure = {}; // leg -> [bets, risk]
+      Batch legBatch = txn.batch();
+
+      for (var bet in bets) {
+        int id = await txn.insert('bets', {
+          'placed_at': now.millisecondsSinceEpoch,
+          'day': day,
+          'week': week,
+          'odds_dec': bet.totalOddsDec,
+          'wager': bet.myWager,
+        });
+        ids.add(id);
+        wagered += bet.myWager;
+        for (var l in bet.legs) {
+          legBatch.insert('bet_legs', {'bet_id': id, 'leg_id': l.id, 'leg_name': l.name, 'event_date': l.eventDate.isNotEmpty ? l.eventDate : day, 'odds_american': l.oddsAmerican, 'confidence': l.confidence});
+          var e = exposure.putIfAbsent(l.name, () => [0, 0]);
+          e[0] += 1;
+          e[1] += bet.myWager;
+        }
+      }
+
+      for (var entry in [['agg_daily', day], ['agg_weekly', week]]) {
+        legBatch.rawInsert('INSERT OR IGNORE INTO ${entry[0]} (bucket) VALUES (?)', [entry[1]]);
+        legBatch.rawUpdate('UPDATE ${entry[0]} SET bets = bets + ?, wagered = wagered + ? WHERE bucket = ?', [bets.length, wagered, entry[1]]);
+      }
+      exposure.forEach((name, e) {
+        legBatch.rawInsert('INSERT OR IGNORE INTO leg_exposure (leg_name) VALUES (?)', [name]);
+        legBatch.rawUpdate('UPDATE leg_exposure SET open_bets = open_bets + ?, open_risk = open_risk + ? WHERE leg_name = ?', [e[0].toInt(), e[1], name]);
+      });
+      await legBatch.commit(noResult: true);
+      return ids;
+    });
+  }
+
+  /// Settles a whole batch of leg results. A result keyed by a leg id grades that leg
+  /// wherever it is pending; a result keyed by name only grades legs with the same event
+  /// date (the game date, or the day logged when unknown), so a recurring name like
+  /// "Chiefs (ML)" never grades another week's bets.
+  /// A bet closes as a loss on its first losing leg, or as a win once every leg has won.
+  Future<LedgerSettlement> settleLegs(List<LegResult> results, {DateTime? at}) async {
+    final outcome = LedgerSettlement();
+    if (results.isEmpty) return outcome;
+    final now = at ?? DateTime.now();
+
+    return _database.transaction((txn) async {
+      Set<String> pendingIds = {};
+      for (var chunk in _chunks(results.map((r) => r.key).toSet().toList())) {
+        var rows = await txn.rawQuery('SELECT DISTINCT leg_id FROM bet_legs WHERE status = $_pending AND leg_id IN (${_marks(chunk.length)})', chunk);
+        for (var r in rows) pendingIds.add(r['leg_id'] as String);
+      }
+
+      Set<int> touched = {};
+      Batch legBatch = txn.batch();
+      for (var r in results) {
+        int status = r.won ? _won : _lost;
+        List<Map<String, Object?>> rows;
+        if (pendingIds.contains(r.key)) {
+          rows = await txn.rawQuery('SELECT bet_id FROM bet_legs WHERE status = $_pending AND leg_id = ?', [r.key]);
+          legBatch.rawUpdate('UPDATE bet_legs SET status = ? WHERE status = $_pending AND leg_id = ?', [status, r.key]);
+        } else if (r.eventDate != null) {
+          rows = await txn.rawQuery('SELECT bet_id FROM bet_legs WHERE status = $_pending AND leg_name = ? AND event_date = ?', [r.key, r.eventDate]);
+          legBatch.rawUpdate('UPDATE bet_legs SET status = ? WHERE status = $_pending AND leg_name = ? AND event_date = ?', [status, r.key, r.eventDate]);
+        } else {
+          rows = const [];
+        }
+        if (rows.isEmpty) { outcome.unmatched.add(r); continue; }
+        outcome.legsGraded += rows.length;
+        for (var row in rows) touched.add(row['bet_id'] as int);
+      }
+      await legBatch.commit(noResult: true);
+      if (touched.isEmpty) return outcome;
+
+      Map<String, List<double>> daily = {}; // bucket -> [settled, settledWagered, pnl]
+      Map<String, List<double>> weekly = {};
+      Map<String, List<double>> exposure = {}; // leg -> [bets, risk]
+      Batch batch = txn.batch();
+
+      for (var chunk in _chunks(touched.toList())) {
+        var rows = await txn.rawQuery(
+          'SELECT b.id, b.day, b.week, b.wager, b.odds_dec, MAX(l.status = $_lost) AS lost, MIN(l.status = $_won) AS won '
+          'FROM bets b JOIN bet_legs l ON l.bet_id = b.id WHERE b.status = $_pending AND b.id IN (${_marks(chunk.length)}) GROUP BY b.id',
+          chunk,
+        );
+        Map<int, double> closedWagers = {};
+        for (var r in rows) {
+          bool lost = r['lost'] == 1;
+          bool won = !lost && r['won'] == 1;
+          if (!lost && !won) continue;
+
+          int id = r['id'] as int;
+          double wager = (r['wager'] as num).toDouble();
+          double pnl = won ? wager * ((r['odds_dec'] as num).toDouble() - 1) : -wager;
+          batch.rawUpdate('UPDATE bets SET status = ?, settled_at = ?, pnl = ? WHERE id = ?', [won ? _won : _lost, now.millisecondsSinceEpoch, pnl, id]);
+          closedWagers[id] = wager;
+          outcome.betsClosed++;
+
+          for (var agg in [daily.putIfAbsent(r['day'] as String, () => [0, 0, 0]), weekly.putIfAbsent(r['week'] as String, () => [0, 0, 0])]) {
+            agg[0] += 1;
+            agg[1] += wager;
+            agg[2] += pnl;
+          }
+        }
+        if (closedWagers.isEmpty) continue;
+
+        var ids = closedWagers.keys.toList();
+        var legRows = await txn.rawQuery('SELECT bet_id, leg_name FROM bet_legs WHERE bet_id IN (${_marks(ids.length)})', ids);
+        for (var r in legRows) {
+          var e = exposure.putIfAbsent(r['leg_name'] as String, () => [0, 0]);
+          e[0] += 1;
+          e[1] += closedWagers[r['bet_id'] as int]!;
+        }
+      }
+
+      daily.forEach((k, v) => batch.rawUpdate('UPDATE agg_daily SET settled = settled + ?, settled_wagered = settled_wagered + ?, pnl = pnl + ? WHERE bucket = ?', [v[0].toInt(), v[1], v[2], k]));
+      weekly.forEach((k, v) => batch.rawUpdate('UPDATE agg_weekly SET settled = settled + ?, settled_wagered = settled_wagered + ?, pnl = pnl + ? WHERE bucket = ?', [v[0].toInt(), v[1], v[2], k]));
+      exposure.forEach((k, v) => batch.rawUpdate('UPDATE leg_exposure SET open_bets = open_bets - ?, open_risk = open_risk - ? WHERE leg_name = ?', [v[0].toInt(), v[1], k]));
+      await batch.commit(noResult: true);
+      return outcome;
+    });
+  }
+
+  /// Rolls up the daily buckets since [sinceKey] (inclusive). At most one row per day is read.
+  Future<LedgerBucket> totals({String? sinceKey}) async {
+    var rows = await _database.rawQuery(
+      'SELECT SUM(bets) AS bets, SUM(settled) AS settled, SUM(wagered) AS wagered, SUM(settled_wagered) AS settled_wagered, SUM(pnl) AS pnl FROM agg_daily WHERE bucket >= ?',
+      [sinceKey ?? ''],
+    );
+    var total = LedgerBucket.fromRow(rows.first);
+    total.key = sinceKey ?? '';
+    return total;
+  }
+
+  Future<List<LedgerBucket>> buckets({bool weekly = false, int limit = 14}) async {
+    var rows = await _database.query(weekly ? 'agg_weekly' : 'agg_daily', orderBy: 'bucket DESC', limit: limit);
+    return rows.map(LedgerBucket.fromRow).toList();
+  }
+
+  Future<List<LegExposure>> exposure({int limit = 10}) async {
+    var rows = await _database.query('leg_exposure', where: 'open_bets > 0', orderBy: 'open_risk DESC', limit: limit);
+    return rows.map((r) => LegExposure(legName: r['leg_name'] as String, openBets: (r['open_bets'] as num).toInt(), openRisk: (r['open_risk'] as num).toDouble())).toList();
+  }
+
+  Future<void> close() async {
+    await _db?.close();
+    _db = null;
+  }
+}
+
+// --- PRICING ENGINE ---
+// The staking formulas from the generator, parameterised so one priced slate can be
+// staked under many settings profiles.
+class StakingProfile {
+  final double bankroll;
+  final double kellyFraction;
+  final double correlationBoostPct;
+  final bool autoFillKelly;
+  final double defaultUnit;
+
+  const StakingProfile({
+    required this.bankroll,
+    required this.kellyFraction,
+    required this.correlationBoostPct,
+    required this.autoFillKelly,
+    required this.defaultUnit,
+  });
+
+  double finalProb(double rawProb, bool isCorr) {
+    double p = rawProb;
+    if (isCorr) p *= (1 + (correlationBoostPct / 100));
+    if (p > 0.99) p = 0.99;
+    return p;
+  }
+
+  double kellyStake(double decOdds, double prob) => fullKelly(decOdds, prob) * kellyFraction * bankroll;
+  double wager(double kellyStake) => autoFillKelly ? kellyStake : defaultUnit;
+
+  // Un-scaled Kelly fraction, floored at zero.
+  static double fullKelly(double decOdds, double prob) {
+    if (decOdds <= 1) return 0.0;
+    double b = decOdds - 1;
+    double q = 1 - prob;
+    return max(0, (b * prob - q) / b);
+  }
+
+  // EV of a 1-unit stake: p * (d - 1) - (1 - p).
+  static double evPerUnit(double decOdds, double prob) => prob * decOdds - 1;
+}
+
+class SweepRow {
+  bool autoFillKelly;
+  double? kellyFraction; // Only drives stakes in Kelly mode
+  double? defaultUnit; // Only drives stakes in flat mode
+  double correlationBoostPct;
+  int bets;
+  double totalRisk;
+  double totalEv;
+  double maxWager;
+  double bestEv;
+
+  SweepRow({
+    required this.autoFillKelly,
+    this.kellyFraction,
+    this.defaultUnit,
+    required this.correlationBoostPct,
+    required this.bets,
+    required this.totalRisk,
+    required this.totalEv,
+    required this.maxWager,
+    required this.bestEv,
+  });
+
+  double get roi => totalRisk > 0 ? (totalEv / totalRisk) * 100 : 0;
+}
+
+// Valid combinations with their setting-independent numbers (odds product, raw
+// probability, SGP flag) held in flat typed arrays.
+class PricedSlate {
+  final List<List<Leg>> combos;
+  final Float64List decTotals;
+  final Float64List rawProbs;
+  final Uint8List correlated;
+
+  PricedSlate._(this.combos, this.decTotals, this.rawProbs, this.correlated);
+
+  int get length => combos.length;
+
+  factory PricedSlate.build(List<Leg> legs, int minLegs, int maxLegs, bool sgpMode) {
+    return (PricedSlateBuilder(legs, minLegs, maxLegs, sgpMode)..advance(-1)).finish();
+  }
+
+  static GeneratedParlay? stakeCombo(List<Leg> combo, double decTotal, double rawProb, bool isCorr, StakingProfile profile) {
+    double finalProb = profile.finalProb(rawProb, isCorr);
+    double kellyStake = profile.kellyStake(decTotal, finalProb);
+    double actualWager = profile.wager(kellyStake);
+    if (actualWager <= 0) return null;
+    return GeneratedParlay(
+      legs: combo,
+      totalOddsDec: decTotal,
+      trueProb: finalProb,
+      kellyStake: kellyStake,
+      myWager: actualWager,
+      ev: actualWager * StakingProfile.evPerUnit(decTotal, finalProb),
+      isCorrelated: isCorr,
+    );
+  }
+
+  GeneratedParlay? stakeAt(int i, StakingProfile profile) => stakeCombo(combos[i], decTotals[i], rawProbs[i], correlated[i] == 1, profile);
+
+  /// Stakes every combo under [profile], keeping those with a positive wager.
+  List<GeneratedParlay> stake(StakingProfile profile) {
+    List<GeneratedParlay> out = [];
+    for (int i = 0; i < length; i++) {
+      var p = stakeAt(i, profile);
+      if (p != null) out.add(p);
+    }
+    out.sort((a, b) => b.ev.compareTo(a.ev));
+    return out;
+  }
+
+  /// Portfolio-level metrics for every point of the settings grid.
+  /// Only the boost changes probabilities, so there is one pass over the arrays per
+  /// boost value. Kelly stakes scale linearly with kellyFraction * bankroll and flat
+  /// stakes with the unit, so every other grid point is derived from that pass's sums.
+  List<SweepRow> sweep({
+    required double bankroll,
+    required List<double> kellyFractions,
+    required List<double> boostPcts,
+    List<bool> autoFillModes = const [true],
+    List<double> units = const [],
+  }) {
+    List<SweepRow> rows = [];
+    for (double boost in boostPcts) {
+      final profile = StakingProfile(bankroll: bankroll, kellyFraction: 1, correlationBoostPct: boost, autoFillKelly: true, defaultUnit: 0);
+      int kellyBets = 0;
+      double sumF = 0, sumFEv = 0, maxF = 0, maxFEv = 0;
+      double sumEv = 0, maxEv = double.negativeInfinity;
+
+      for (int i = 0; i < length; i++) {
+        double p = profile.finalProb(rawProbs[i], correlated[i] == 1);
+        double f = StakingProfile.fullKelly(decTotals[i], p);
+        double e = StakingProfile.evPerUnit(decTotals[i], p);
+        sumEv += e;
+        if (e > maxEv) maxEv = e;
+        if (f > 0) {
+          if (kellyBets == 0 || f * e > maxFEv) maxFEv = f * e;
+          kellyBets++;
+          sumF += f;
+          sumFEv += f * e;
+          if (f > maxF) maxF = f;
+        }
+      }
+
+      if (autoFillModes.contains(true)) {
+        for (double k in kellyFractions) {
+          double scale = k * bankroll;
+          bool staked = scale > 0 && kellyBets > 0;
+          rows.add(SweepRow(
+            autoFillKelly: true, kellyFraction: k, correlationBoostPct: boost,
+            bets: staked ? kellyBets : 0,
+            totalRisk: staked ? scale * sumF : 0,
+            totalEv: staked ? scale * sumFEv : 0,
+            maxWager: staked ? scale * maxF : 0,
+            bestEv: staked ? scale * maxFEv : 0,
+          ));
+        }
+      }
+      if (autoFillModes.contains(false)) {
+        for (double unit in units) {
+          bool staked = unit > 0 && length > 0;
+          rows.add(SweepRow(
+            autoFillKelly: false, defaultUnit: unit, correlationBoostPct: boost,
+            bets: staked ? length : 0,
+            totalRisk: staked ? unit * length : 0,
+            totalEv: staked ? unit * sumEv : 0,
+            maxWager: staked ? unit : 0,
+            bestEv: staked ? unit * maxEv : 0,
+          ));
+        }
+      }
+    }
+    return rows;
+  }
+}
+
+// Enumerates and prices a slate incrementally so long runs can report progress and
+// stop between chunks.
+class PricedSlateBuilder {
+  final int total; // Raw combinations before exclusion filtering
+  final bool sgpMode;
+  final Iterator<List<Leg>> _enumerator;
+  final List<List<Leg>> _combos = [];
+  final List<double> _decTotals = [];
+  final List<double> _rawProbs = [];
+  final List<int> _correlated = [];
+  int processed = 0;
+  bool isDone = false;
+
+  PricedSlateBuilder(List<Leg> legs, int minLegs, int maxLegs, this.sgpMode)
+      : total = _countCombinations(legs.length, minLegs, maxLegs),
+        _enumerator = _allCombinations(legs, minLegs, maxLegs).iterator;
+
+  int get length => _combos.length;
+
+  static int _countCombinations(int n, int minLegs, int maxLegs) {
+    int sum = 0;
+    for (int r = minLegs; r <= min(maxLegs, n); r++) {
+      int c = 1;
+      for (int i = 0; i < r; i++) c = c * (n - i) ~/ (i + 1);
+      sum += c;
+    }
+    return sum;
+  }
+
+  static Iterable<List<Leg>> _allCombinations(List<Leg> legs, int minLegs, int maxLegs) sync* {
+    for (int r = minLegs; r <= maxLegs; r++) {
+      yield* _combinations(legs, r, 0, []);
+    }
+  }
+
+  static Iterable<List<Leg>> _combinations(List<Leg> source, int k, int start, List<Leg> current) sync* {
+    if (current.length == k) {
+      yield current;
+      return;
+    }
+    for (int i = start; i < source.length; i++) {
+      current.add(source[i]);
+      yield* _combinations(source, k, i + 1, current);
+      current.removeLast();
+    }
+  }
+
+  /// Enumerates up to [count] more raw combinations (all of them if negative).
+  void advance(int count) {
+    for (int n = 0; (count < 0 || n < count) && !isDone; n++) {
+      if (!_enumerator.moveNext()) { isDone = true; break; }
+      processed++;
+      final combo = _enumerator.current;
+
+      var exclGroups = combo.where((l) => l.exclGroup.isNotEmpty).map((l) => l.exclGroup).toList();
+      if (exclGroups.toSet().length != exclGroups.length) continue;
+
+      bool isCorr = false;
+      if (sgpMode) {
+         var links = combo.where((l) => l.linkGroup.isNotEmpty).map((l) => l.linkGroup).toList();
+         if (links.toSet().length != links.length) isCorr = true;
+      }
+
+      _combos.add(List.from(combo));
+      _decTotals.add(combo.fold(1.0, (prev, elem) => prev * elem.decimalOdds));
+      _rawProbs.add(combo.fold(1.0, (prev, elem) => prev * (elem.myProb)));
+      _correlated.add(isCorr ? 1 : 0);
+    }
+  }
+
+  GeneratedParlay? stakeAt(int i, StakingProfile profile) => PricedSlate.stakeCombo(_combos[i], _decTotals[i], _rawProbs[i], _correlated[i] == 1, profile);
+
+  PricedSlate finish() => PricedSlate._(_combos, Float64List.fromList(_decTotals), Float64List.fromList(_rawProbs), Uint8List.fromList(_correlated));
+}
+
+// --- BACKTEST ENGINE ---
+class ArchivedSlate {
+  final String date;
+  final List<Leg> legs;
+  final Map<String, bool> results; // leg id -> won; missing = unsettled
+
+  ArchivedSlate({required this.date, required this.legs, required this.results});
+}
+
+class BacktestProfile {
+  final StakingProfile staking;
+  final int minLegs;
+  final int maxLegs;
+  final bool sgpMode;
+  final int maxBetsPerSlate; // Top +EV picks taken from each slate
+
+  const BacktestProfile({required this.staking, required this.minLegs, required this.maxLegs, required this.sgpMode, this.maxBetsPerSlate = 10});
+}
+
+class BacktestDay {
+  final String date;
+  final int bets;
+  final int wins;
+  final double wagered;
+  final double pnl;
+
+  const BacktestDay({required this.date, required this.bets, required this.wins, required this.wagered, required this.pnl});
+}
+
+class BacktestReport {
+  final List<BacktestDay> days; // Sorted by date
+  final List<double> bankrollPath; // Starting bankroll, then one point per day
+  final int datesTotal;
+  final double wagered;
+  final double maxDrawdown;
+  final double maxDrawdownPct;
+
+  BacktestReport._(this.days, this.bankrollPath, this.datesTotal, this.wagered, this.maxDrawdown, this.maxDrawdownPct);
+
+  /// Each day in [finished] was staked off [startBankroll]. With [compound] (Kelly staking)
+  /// a day's wagers and P&L are rescaled to the bankroll reached so far, since Kelly stakes
+  /// are linear in bankroll; flat stakes don't depend on bankroll and simply add up.
+  /// Either way a day can't stake more than the bankroll left, and a bankroll that hits
+  /// zero is bust: it never goes negative and later days stake nothing.
+  factory BacktestReport.build(List<BacktestDay> finished, double startBankroll, int datesTotal, {bool compound = false}) {
+    List<BacktestDay> days = List.from(finished)..sort((a, b) => a.date.compareTo(b.date));
+    List<double> path = [startBankroll];
+    double running = max(0.0, startBankroll), peak = running, maxDd = 0, maxDdPct = 0, wagered = 0;
+    for (var d in days) {
+      double scale = compound ? (startBankroll > 0 ? running / startBankroll : 0) : 1;
+      double stake = d.wagered * scale;
+      if (stake > running) scale *= running / stake;
+      wagered += d.wagered * scale;
+      running = max(0.0, running + d.pnl * scale);
+      path.add(running);
+      peak = max(peak, running);
+      if (peak - running > maxDd) {
+        maxDd = peak - running;
+        maxDdPct = peak > 0 ? (maxDd / peak) * 100 : 0;
+      }
+    }
+    return BacktestReport._(days, path, datesTotal, wagered, maxDd, maxDdPct);
+  }
+
+  bool get done => days.length >= datesTotal;
+  int get bets => days.fold(0, (sum, d) => sum + d.bets);
+  int get wins => days.fold(0, (sum, d) => sum + d.wins);
+  double get pnl => bankrollPath.last - bankrollPath.first;
+  double get roi => wagered > 0 ? (pnl / wagered) * 100 : 0;
+  double get winRate => bets > 0 ? (wins / bets) * 100 : 0;
+  bool get bust => bankrollPath.first > 0 && bankrollPath.last <= 0;
+}
+
+// Replays archived slates through the generator's pricing, staking and selection.
+// Every slate is staked off the profile's starting bankroll, so dates are independent
+// and run across a pool of isolates; BacktestReport.build then rescales Kelly-staked
+// days to the running bankroll (flat-staked days are a cumulative sum).
+class Backtester {
+  /// Archive format: Date,Name,Odds,Conf,Excl,Link,Result (WIN/LOSS, blank if unsettled).
+  static List<ArchivedSlate> parseArchive(String text) {
+    Map<String, ArchivedSlate> byDate = {};
+    for (String line in text.split('\n')) {
+      line = line.trim(); if (line.isEmpty || line.startsWith("Date")) continue;
+      var parts = line.split(line.contains('\t') ? '\t' : ',').map((e) => e.trim()).toList();
+      if (parts.length < 3) continue;
+      var slate = byDate.putIfAbsent(parts[0], () => ArchivedSlate(date: parts[0], legs: [], results: {}));
+      var leg = Leg(
+        id: "${parts[0]}-${slate.legs.length}",
+        name: parts[1],
+        oddsAmerican: double.tryParse(parts[2]) ?? -110,
+        confidence: parts.length > 3 ? double.tryParse(parts[3]) ?? 5 : 5,
+        exclGroup: parts.length > 4 ? parts[4] : '',
+        linkGroup: parts.length > 5 ? parts[5] : '',
+      );
+      slate.legs.add(leg);
+      String result = parts.length > 6 ? parts[6].toUpperCase() : '';
+      if (result == 'WIN' || result == 'W') slate.results[leg.id] = true;
+      if (result == 'LOSS' || result == 'L') slate.results[leg.id] = false;
+    }
+    return byDate.values.toList()..sort((a, b) => a.date.compareTo(b.date));
+  }
+
+  static BacktestDay runSlate(ArchivedSlate slate, BacktestProfile profile) {
+    List<Leg> activeLegs = slate.legs.where((l) => l.active).toList();
+    var picks = PricedSlate.build(activeLegs, profile.minLegs, profile.maxLegs, profile.sgpMode)
+        .stake(profile.staking)
+        .where((p) => p.ev > 0)
+        .take(profile.maxBetsPerSlate);
+
+    int bets = 0, wins = 0;
+    double wagered = 0, pnl = 0;
+    for (var p in picks) {
+      // A losing leg settles the pick; otherwise it needs every leg graded a win.
+      bool lost = p.legs.any((l) => slate.results[l.id] == false);
+      bool won = !lost && p.legs.every((l) => slate.results[l.id] == true);
+      if (!lost && !won) continue;
+      bets++;
+      wagered += p.myWager;
+      if (won) { wins++; pnl += p.potentialPayout; } else { pnl -= p.myWager; }
+    }
+    return BacktestDay(date: slate.date, bets: bets, wins: wins, wagered: wagered, pnl: pnl);
+  }
+
+  static List<BacktestDay> _runChunk(List<ArchivedSlate> chunk, BacktestProfile profile) {
+    return chunk.map((s) => runSlate(s, profile)).toList();
+  }
+
+  // Kept separate so the isolate closure captures only the chunk and profile.
+  // Web has no isolates: chunks (one slate each there) run in-process on a timer, so
+  // the UI gets a frame between every slate.
+  static Future<List<BacktestDay>> _spawnChunk(List<ArchivedSlate> chunk, BacktestProfile profile) {
+    if (kIsWeb) return Future.delayed(Duration.zero, () => _runChunk(chunk, profile));
+    return Isolate.run(() => _runChunk(chunk, profile));
+  }
+
+  /// Emits an updated report as each chunk of dates finishes; the last one has [BacktestReport.done].
+  static Stream<BacktestReport> run(List<ArchivedSlate> slates, BacktestProfile profile, {int? workers}) {
+    final controller = StreamController<BacktestReport>();
+    final double start = profile.staking.bankroll;
+    final bool compound = profile.staking.autoFillKelly;
+    if (slates.isEmpty) {
+      controller.add(BacktestReport.build([], start, 0));
+      controller.close();
+      return controller.stream;
+    }
+
+    final int pool = kIsWeb ? 1 : max(1, workers ?? Platform.numberOfProcessors);
+    // Small chunks keep the report streaming; on web every chunk blocks the UI, so one slate each.
+    final int chunkSize = kIsWeb ? 1 : max(1, (slates.length / (pool * 4)).ceil());
+    final List<List<ArchivedSlate>> queue = [
+      for (int i = 0; i < slates.length; i += chunkSize) slates.sublist(i, min(i + chunkSize, slates.length))
+    ];
+    final List<BacktestDay> finished = [];
+    controller.onCancel = () => queue.clear();
+
+    Future<void> worker() async {
+      while (queue.isNotEmpty && !controller.isClosed) {
+        final chunk = queue.removeAt(0);
+        finished.addAll(await _spawnChunk(chunk, profile));
+        if (!controller.isClosed) controller.add(BacktestReport.build(finished, start, slates.length, compound: compound));
+      }
+    }
+
+    Future.wait(List.generate(min(pool, queue.length), (_) => worker())).then(
+      (_) => controller.close(),
+      onError: (Object e, StackTrace st) {
+        if (controller.isClosed) return;
+        controller.addError(e, st);
+        controller.close();
+      },
+    );
+    return controller.stream;
+  }
+}
+
+// --- ENGINE WORKER ---
+// Long-lived isolate that owns the priced-slate cache. It survives every rebuild and
+// rerun, so changing staking settings re-stakes a warm slate instead of re-enumerating.
+// Long runs are jobs: they work in chunks, stream JobProgress between chunks and
+// check for cancellation there.
+class JobProgress {
+  final int processed;
+  final int total;
+  final Duration elapsed;
+  final double? best; // Best EV so far (generate) / best session so far (sims)
+  final Object? partial; // Top picks so far (generate) / SimSummary so far (sims)
+
+  const JobProgress({required this.processed, required this.total, required this.elapsed, this.best, this.partial});
+
+  double get fraction => total > 0 ? min(1.0, processed / total) : 0;
+  Duration? get eta => processed > 0 ? elapsed * ((total - processed) / processed) : null;
+}
+
+class SimSummary {
+  final int runs;
+  final double avgProfit;
+  final double winRate;
+  final double bestCase;
+  final double worstCase;
+
+  const SimSummary({required this.runs, required this.avgProfit, required this.winRate, required this.bestCase, required this.worstCase});
+
+  factory SimSummary.fromResults(List<double> results) {
+    return SimSummary(
+      runs: results.length,
+      avgProfit: results.reduce((a, b) => a + b) / results.length,
+      bestCase: results.reduce(max),
+      worstCase: results.reduce(min),
+      winRate: (results.where((r) => r > 0).length / results.length) * 100,
+    );
+  }
+}
+
+class JobCancelled implements Exception {
+  @override
+  String toString() => "Job cancelled";
+}
+
+class EngineJob<T> {
+  final int id;
+  final Stream<JobProgress> progress;
+  final Future<T> result;
+  final void Function() _cancel;
+
+  EngineJob._(this.id, this.progress, this.result, this._cancel);
+
+  /// Asks the worker to stop at its next chunk boundary; [result] then fails with [JobCancelled].
+  void cancel() => _cancel();
+}
+
+class _EngineCache {
+  static const int _maxSlates = 4;
+  final Map<String, PricedSlate> _slates = {}; // Insertion order doubles as LRU order
+  int hits = 0;
+  int misses = 0;
+
+  // Every Leg field a priced combo carries, so a hit never hands back stale leg ids.
+  static String keyFor(List<Leg> activeLegs, int minLegs, int maxLegs, bool sgpMode) {
+    return [minLegs, maxLegs, sgpMode, for (var l in activeLegs) "${l.id}|${l.name}|${l.eventDate}|${l.oddsAmerican}|${l.confidence}|${l.exclGroup}|${l.linkGroup}"].join('\n');
+  }
+
+  PricedSlate? lookup(String key) {
+    PricedSlate? slate = _slates.remove(key);
+    if (slate == null) { misses++; return null; }
+    hits++;
+    _slates[key] = slate;
+    return slate;
+  }
+
+  void store(String key, PricedSlate slate) {
+    _slates.remove(key);
+    _slates[key] = slate;
+    if (_slates.length > _maxSlates) _slates.remove(_slates.keys.first);
+  }
+}
+
+class _EngineIsolate {
+  static const int _comboChunk = 20000;
+  static const int _simChunk = 100;
+  static const int _previewSize = 10;
+
+  final void Function(Object?) reply; // Port send, or a direct call when running in-process
+  final _EngineCache cache = _EngineCache();
+  final Set<int> _running = {};
+  final Set<int> _cancelled = {}; // Always a subset of _running
+
+  _EngineIsolate(this.reply);
+
+  void onMessage(Object? msg) {
+    final request = msg as List; // [id, op, args] or ['cancel', id]
+    if (request[0] == 'cancel') {
+      // A cancel can race its job's last chunk; only record it while the job is in flight.
+      final int target = request[1] as int;
+      if (_running.contains(target)) _cancelled.add(target);
+      return;
+    }
+
+    final int id = request[0] as int;
+    final String op = request[1] as String;
+    final List<Object?> args = request[2] as List<Object?>;
+    Future<Object?> job;
+    switch (op) {
+      case 'generate': job = _generate(id, args); break;
+      case 'sims': job = _sims(id, args); break;
+      case 'price': job = _price(id, args); break;
+      case 'sweep': job = _sweep(id, args); break;
+      default:
+        reply([id, false, "Unknown engine op: $op"]);
+        return;
+    }
+    // Jobs run synchronously up to their first checkpoint, so no cancel can arrive before this.
+    _running.add(id);
+    job.then(
+      (result) => reply([id, true, result]),
+      onError: (Object e) => reply(e is JobCancelled ? [id, 'cancelled', null] : [id, false, e.toString()]),
+    ).whenComplete(() {
+      _running.remove(id);
+      _cancelled.remove(id);
+    });
+  }
+
+  // Yields to the isolate's event loop so queued cancel messages are seen.
+  Future<void> _checkpoint(int id) async {
+    await Future.delayed(Duration.zero);
+    if (_cancelled.contains(id)) throw JobCancelled();
+  }
+
+  Future<List<GeneratedParlay>> _generate(int id, List<Object?> args) async {
+    final clock = Stopwatch()..start();
+    final activeLegs = (args[0] as List<Leg>).where((l) => l.active).toList();
+    final int minLegs = args[1] as int, maxLegs = args[2] as int;
+    final bool sgpMode = args[3] as bool;
+    final profile = args[4] as StakingProfile;
+
+    final key = _EngineCache.keyFor(activeLegs, minLegs, maxLegs, sgpMode);
+    final PricedSlate? cached = cache.lookup(key);
+    final PricedSlateBuilder? builder = cached == null ? PricedSlateBuilder(activeLegs, minLegs, maxLegs, sgpMode) : null;
+    final int total = builder?.total ?? cached!.length;
+
+    List<GeneratedParlay> out = [];
+    List<GeneratedParlay> preview = [];
+    int staked = 0;
+    while (true) {
+      await _checkpoint(id);
+      int available;
+      if (builder != null) {
+        builder.advance(_comboChunk);
+        available = builder.length;
+      } else {
+        available = min(staked + _comboChunk, cached!.length);
+      }
+      for (; staked < available; staked++) {
+        var p = builder != null ? builder.stakeAt(staked, profile) : cached!.stakeAt(staked, profile);
+        if (p == null) continue;
+        out.add(p);
+        if (preview.length < _previewSize || p.ev > preview.last.ev) {
+          preview.add(p);
+          preview.sort((a, b) => b.ev.compareTo(a.ev));
+          if (preview.length > _previewSize) preview.removeLast();
+        }
+      }
+      bool done = builder != null ? builder.isDone : staked >= cached!.length;
+      reply([id, 'progress', JobProgress(
+        processed: builder?.processed ?? staked, total: total, elapsed: clock.elapsed,
+        best: preview.isEmpty ? null : preview.first.ev, partial: List<GeneratedParlay>.from(preview),
+      )]);
+      if (done) break;
+    }
+
+    if (builder != null) cache.store(key, builder.finish());
+    out.sort((a, b) => b.ev.compareTo(a.ev));
+    return out;
+  }
+
+  // Returns the cached slate for args [legs, minLegs, maxLegs, sgpMode, ...], or prices it
+  // chunk by chunk (streaming progress) and caches it.
+  Future<PricedSlate> _slate(int id, List<Object?> args) async {
+    final clock = Stopwatch()..start();
+    final activeLegs = (args[0] as List<Leg>).where((l) => l.active).toList();
+    final int minLegs = args[1] as int, maxLegs = args[2] as int;
+    final bool sgpMode = args[3] as bool;
+
+    final key = _EngineCache.keyFor(activeLegs, minLegs, maxLegs, sgpMode);
+    final PricedSlate? cached = cache.lookup(key);
+    if (cached != null) return cached;
+
+    final builder = PricedSlateBuilder(activeLegs, minLegs, maxLegs, sgpMode);
+    while (!builder.isDone) {
+      await _checkpoint(id);
+      builder.advance(_comboChunk);
+      reply([id, 'progress', JobProgress(processed: builder.processed, total: builder.total, elapsed: clock.elapsed)]);
+    }
+    final slate = builder.finish();
+    cache.store(key, slate);
+    return slate;
+  }
+
+  Future<int> _price(int id, List<Object?> args) async {
+    return (await _slate(id, args)).length;
+  }
+
+  Future<List<Object>> _sweep(int id, List<Object?> args) async {
+    final slate = await _slate(id, args);
+    await _checkpoint(id);
+    return [
+      slate.sweep(
+        bankroll: args[4] as double,
+        kellyFractions: args[5] as List<double>,
+        boostPcts: args[6] as List<double>,
+        autoFillModes: args[7] as List<bool>,
+        units: args[8] as List<double>,
+      ),
+      slate.length,
+    ];
+  }
+
+  Future<SimSummary> _sims(int id, List<Object?> args) async {
+    final clock = Stopwatch()..start();
+    final bets = args[0] as List<GeneratedParlay>;
+    final int runs = args[1] as int;
+
+    List<double> results = [];
+    Random rng = Random();
+    Map<String, double> uniqueLegProbs = {};
+    for (var p in bets) {
+      for (var l in p.legs) uniqueLegProbs[l.name] = l.myProb;
+    }
+
+    while (results.length < runs) {
+      await _checkpoint(id);
+      for (int i = 0; i < _simChunk && results.length < runs; i++) {
+        double sessionProfit = 0;
+        Map<String, bool> outcomes = {};
+        uniqueLegProbs.forEach((key, prob) {
+          outcomes[key] = rng.nextDouble() < prob;
+        });
+
+        for (var p in bets) {
+          bool won = p.legs.every((l) => outcomes[l.name] == true);
+          if (won) sessionProfit += p.potentialPayout; else sessionProfit -= p.myWager;
+        }
+        results.add(sessionProfit);
+      }
+      final summary = SimSummary.fromResults(results);
+      reply([id, 'progress', JobProgress(processed: results.length, total: runs, elapsed: clock.elapsed, best: summary.bestCase, partial: summary)]);
+    }
+    return SimSummary.fromResults(results);
+  }
+}
+
+class _PendingCall {
+  final Completer<Object?> completer = Completer<Object?>();
+  final StreamController<JobProgress> progress = StreamController<JobProgress>.broadcast();
+}
+
+class EngineWorker {
+  final Map<int, _PendingCall> _pending = {};
+  void Function(Object?)? _send; // Delivers a command to the worker isolate or the in-process engine
+  ReceivePort? _replies;
+  ReceivePort? _exits;
+  Future<void>? _starting;
+  int _nextId = 0;
+  Duration? warmupTime;
+  bool inProcess = false; // No isolates (web): the engine runs on the UI isolate
+
+  bool get isWarm => _send != null;
+
+  Future<void> start() => _starting ??= _spawn();
+
+  Future<void> _spawn() async {
+    final clock = Stopwatch()..start();
+    if (kIsWeb) {
+      _startInProcess();
+      warmupTime = clock.elapsed;
+      return;
+    }
+
+    final replies = ReceivePort();
+    final exits = ReceivePort();
+    _replies = replies;
+    _exits = exits;
+    final ready = Completer<SendPort>();
+    replies.listen((msg) {
+      if (msg is SendPort) { ready.complete(msg); return; }
+      _onReply(msg as List);
+    });
+    // onError delivers [error, stack]; onExit delivers null. Either way the worker is gone.
+    exits.listen((msg) {
+      if (!identical(_exits, exits)) return;
+      final reason = StateError(msg is List ? "Engine worker crashed: ${msg[0]}" : "Engine worker exited");
+      if (!ready.isCompleted) ready.completeError(reason);
+      _shutdown(reason);
+    });
+
+    try {
+      await Isolate.spawn(_workerMain, replies.sendPort, debugName: 'parlay-engine', onError: exits.sendPort, onExit: exits.sendPort);
+      _send = (await ready.future).send;
+    } on UnsupportedError {
+      _closePorts();
+      _startInProcess();
+    } catch (e) {
+      _shutdown(e); // Clears _starting so the next call respawns
+      rethrow;
+    }
+    warmupTime = clock.elapsed;
+  }
+
+  void _startInProcess() {
+    inProcess = true;
+    final engine = _EngineIsolate(_onReply);
+    _send = (msg) { if (msg != null) engine.onMessage(msg); };
+  }
+
+  void _onReply(Object? msg) {
+    final reply = msg as List; // [id, status, payload]
+    final int id = reply[0] as int;
+    if (reply[1] == 'progress') { _pending[id]?.progress.add(reply[2] as JobProgress); return; }
+
+    final call = _pending.remove(id);
+    if (call == null) return;
+    if (reply[1] == true) {
+      call.completer.complete(reply[2]);
+    } else {
+      call.completer.completeError(reply[1] == 'cancelled' ? JobCancelled() : Exception(reply[2]));
+    }
+    call.progress.close();
+  }
+
+  void _closePorts() {
+    _replies?.close();
+    _exits?.close();
+    _replies = null;
+    _exits = null;
+  }
+
+  // Fails every in-flight call and forgets the worker so the next call starts a fresh one.
+  void _shutdown(Object reason) {
+    _closePorts();
+    _send = null;
+    _starting = null;
+    warmupTime = null;
+    for (var call in _pending.values) {
+      call.completer.completeError(reason);
+      call.progress.close();
+    }
+    _pending.clear();
+  }
+
+  void Function(Object?) get _sender {
+    final send = _send;
+    if (send == null) throw StateError("Engine worker not running");
+    return send;
+  }
+
+  EngineJob<T> _startJob<T>(String op, List<Object?> args) {
+    final id = _nextId++;
+    final call = _PendingCall();
+    _pending[id] = call;
+    // Both sends chain off the same future, so a cancel can never overtake its job.
+    final started = start();
+    started.then((_) => _sender([id, op, args])).catchError((Object e) {
+      if (_pending.remove(id) == null) return;
+      call.completer.completeError(e);
+      call.progress.close();
+    });
+    return EngineJob._(
+      id,
+      call.progress.stream,
+      call.completer.future.then((r) => r as T),
+      () => started.then((_) => _send?.call(['cancel', id]), onError: (Object _) {}),
+    );
+  }
+
+  /// Prices (and caches) a slate ahead of the first generate. Resolves to the combo count.
+  EngineJob<int> prime(List<Leg> legs, int minLegs, int maxLegs, bool sgpMode) {
+    return _startJob('price', [legs, minLegs, maxLegs, sgpMode]);
+  }
+
+  EngineJob<List<GeneratedParlay>> generate(List<Leg> legs, int minLegs, int maxLegs, bool sgpMode, StakingProfile profile) {
+    return _startJob('generate', [legs, minLegs, maxLegs, sgpMode, profile]);
+  }
+
+  EngineJob<SimSummary> simulate(List<GeneratedParlay> bets, {int runs = 1000}) {
+    return _startJob('sims', [bets, runs]);
+  }
+
+  /// Resolves to the sweep rows and the number of combos priced. Progress covers pricing
+  /// only; a warm slate skips straight to the sweep.
+  EngineJob<List<Object>> sweep(List<Leg> legs, int minLegs, int maxLegs, bool sgpMode, {required double bankroll, required List<double> kellyFractions, required List<double> boostPcts, required List<bool> autoFillModes, required List<double> units}) {
+    return _startJob('sweep', [legs, minLegs, maxLegs, sgpMode, bankroll, kellyFractions, boostPcts, autoFillModes, units]);
+  }
+
+  void dispose() {
+    _send?.call(null);
+    _shutdown(StateError("Engine worker stopped"));
+  }
+
+  static void _workerMain(SendPort replies) {
+    final commands = ReceivePort();
+    final engine = _EngineIsolate(replies.send);
+    replies.send(commands.sendPort);
+    commands.listen((msg) {
+      if (msg == null) { commands.close(); return; }
+      engine.onMessage(msg);
+    });
+  }
+}
+
 // --- MAIN SCREEN ---
 class EngineHome extends StatefulWidget {
   const EngineHome({super.key});
@@ -141,6 +1269,17 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
   double _simBestCase = 0;
   double _simWorstCase = 0;
   bool _hasRunSim = false;
+  int _simRuns = 0; // Runs behind the numbers shown; below _simRunsTotal they are a partial sample
+  int _simRunsTotal = 0;
+
+  // SWEEP STATE
+  List<SweepRow> _sweepRows = [];
+  int _sweepComboCount = 0;
+
+  // BACKTEST STATE
+  BacktestReport? _backtestReport;
+  StreamSubscription<BacktestReport>? _backtestSub;
+  bool _isBacktesting = false;
 
   // SCENARIO STATE
   Map<String, int> _scenarioOutcomes = {};
@@ -162,11 +1301,31 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
   bool _autoFillKelly = false;
   double _defaultUnit = 10.0;
   
+  // LEDGER STATE
+  final BetLedger _ledger = BetLedger();
+  LedgerBucket _ledgerSeason = LedgerBucket();
+  List<LedgerBucket> _ledgerDaily = [];
+  List<LedgerBucket> _ledgerWeekly = [];
+  List<LegExposure> _ledgerExposure = [];
+
   // API STATE
   String _apiKey = "39298e045fe53816e45b2672570ff942"; // AUTO-SET KEY
   String _selectedSport = "americanfootball_nfl";
   bool _isFetching = false;
 
+  // ENGINE STATE
+  final EngineWorker _engine = EngineWorker();
+  Duration? _startupTime;
+  Duration? _lastEngineLatency;
+
+  // JOB STATE
+  EngineJob<List<GeneratedParlay>>? _generateJob;
+  EngineJob<SimSummary>? _simJob;
+  EngineJob<List<Object>>? _sweepJob;
+  JobProgress? _generateProgress;
+  JobProgress? _simProgress;
+  JobProgress? _sweepProgress;
+
   @override
   void initState() {
     super.initState();
@@ -178,6 +1337,29 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
       Leg(id: '1', name: 'Example Team A', exclGroup: 'A', linkGroup: '', oddsAmerican: -110, confidence: 5),
       Leg(id: '2', name: 'Example Team B', exclGroup: 'A', linkGroup: '', oddsAmerican: -110, confidence: 5),
     ];
+
+    // Keep the first frame cheap: storage and the engine isolate come up right after it.
+    WidgetsBinding.instance.addPostFrameCallback((_) {
+      _startupTime = _launchClock.elapsed;
+      if (_startupTime! > kStartupBudget) debugPrint("STARTUP OVER BUDGET: ${_startupTime!.inMilliseconds}ms > ${kStartupBudget.inMilliseconds}ms");
+
+      _ledger.open().then((_) => _refreshLedger()).catchError((e) {
+        if (!mounted) return;
+        ScaffoldMessenger.of(context).showSnackBar(SnackBar(content: Text("LEDGER UNAVAILABLE: $e"), backgroundColor: Colors.red));
+      });
+      _engine.prime(_legs, _minLegs.toInt(), _maxLegs.toInt(), _sgpMode).result.then((_) { if (mounted) setState(() {}); }).catchError((e) {
+        debugPrint("ENGINE WARMUP FAILED: $e");
+      });
+    });
+  }
+
+  @override
+  void dispose() {
+    _backtestSub?.cancel();
+    _engine.dispose();
+    _ledger.close();
+    _tabController.dispose();
+    super.dispose();
   }
 
   // --- API LOGIC (FANDUEL) ---
@@ -186,6 +1368,7 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
     final url = Uri.parse('https://api.the-odds-api.com/v4/sports/$_selectedSport/odds/?regions=us&markets=h2h&bookmakers=fanduel&oddsFormat=american&apiKey=$_apiKey');
     
     try {
+      await http.loadLibrary();
       final response = await http.get(url);
       
       if (response.statusCode == 200) {
@@ -195,6 +1378,8 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
 
         for (var game in data) {
           String gameId = game['id'] ?? "unknown";
+          DateTime? kickoff = DateTime.tryParse(game['commence_time'] ?? '');
+          String eventDate = kickoff == null ? '' : BetLedger.dayKey(kickoff.toLocal());
           // Use last 5 chars of ID as Group ID to prevent betting both sides
           String groupId = gameId.length > 5 ? gameId.substring(gameId.length - 5) : gameId;
           
@@ -216,7 +1401,8 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
                     confidence: 5, // Default confidence
                     exclGroup: groupId, // Prevents betting both sides
                     linkGroup: groupId, // SGP Logic (Same Game)
-                    active: true
+                    active: true,
+                    eventDate: eventDate,
                   ));
                   count++;
                 }
@@ -244,14 +1430,13 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
   }
 
   // --- MATH ENGINE ---
-  double _calculateKelly(double decOdds, double winProbPercent) {
-    if (decOdds <= 1) return 0.0;
-    double b = decOdds - 1;
-    double p = winProbPercent / 100;
-    double q = 1 - p;
-    double kelly = (b * p - q) / b;
-    return max(0, kelly * _kellyFraction);
-  }
+  StakingProfile get _stakingProfile => StakingProfile(
+    bankroll: _bankroll,
+    kellyFraction: _kellyFraction,
+    correlationBoostPct: _correlationBoostPct,
+    autoFillKelly: _autoFillKelly,
+    defaultUnit: _defaultUnit,
+  );
 
   double _getDecimal(double usOdds) {
     if (usOdds >= 100) return (usOdds / 100) + 1;
@@ -259,98 +1444,171 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
     return 1.0;
   }
 
-  void _generateParlays() {
+  Future<void> _generateParlays() async {
+    _generateJob?.cancel(); // A new run supersedes the old one
+    final clock = Stopwatch()..start();
+    final job = _engine.generate(_legs, _minLegs.toInt(), _maxLegs.toInt(), _sgpMode, _stakingProfile);
     setState(() {
-      _portfolio.clear();
-      _hasRunSim = false;
-      List<Leg> activeLegs = _legs.where((l) => l.active).toList();
-      
-      for (int r = _minLegs.toInt(); r <= _maxLegs.toInt(); r++) {
-        _getCombinations(activeLegs, r, 0, [], (combo) {
-          var exclGroups = combo.where((l) => l.exclGroup.isNotEmpty).map((l) => l.exclGroup).toList();
-          if (exclGroups.toSet().length != exclGroups.length) return; 
-
-          bool isCorr = false;
-          if (_sgpMode) {
-             var links = combo.where((l) => l.linkGroup.isNotEmpty).map((l) => l.linkGroup).toList();
-             if (links.toSet().length != links.length) isCorr = true;
-          }
+      _generateJob = job;
+      _generateProgress = null;
+    });
+    job.progress.listen((progress) {
+      if (mounted && identical(_generateJob, job)) setState(() => _generateProgress = progress);
+    });
 
-          double decTotal = combo.fold(1.0, (prev, elem) => prev * elem.decimalOdds);
-          double rawProb = combo.fold(1.0, (prev, elem) => prev * (elem.myProb)); 
-          
-          double finalProb = rawProb;
-          if (isCorr) finalProb *= (1 + (_correlationBoostPct / 100));
-          if (finalProb > 0.99) finalProb = 0.99;
-
-          double kellyStake = _calculateKelly(decTotal, finalProb * 100) * _bankroll;
-          double actualWager = _autoFillKelly ? kellyStake : _defaultUnit;
-          double ev = (finalProb * ((decTotal * actualWager) - actualWager)) - ((1 - finalProb) * actualWager);
-
-          if (actualWager > 0) {
-            _portfolio.add(GeneratedParlay(
-              legs: List.from(combo),
-              totalOddsDec: decTotal,
-              trueProb: finalProb,
-              kellyStake: kellyStake,
-              myWager: actualWager,
-              ev: ev,
-              isCorrelated: isCorr,
-            ));
-          }
+    try {
+      List<GeneratedParlay> portfolio = await job.result;
+      if (!mounted || !identical(_generateJob, job)) return;
+      _simJob?.cancel(); // Its bets belong to the portfolio being replaced
+      setState(() {
+        _simJob = null;
+        _simProgress = null;
+        _hasRunSim = false;
+        _portfolio = portfolio;
+        _lastEngineLatency = clock.elapsed;
+      });
+    } on JobCancelled {
+      // Superseded or cancelled: the current portfolio stays on screen.
+    } catch (e) {
+      if (!mounted || !identical(_generateJob, job)) return;
+      ScaffoldMessenger.of(context).showSnackBar(SnackBar(content: Text("ENGINE FAILED: $e"), backgroundColor: Colors.red));
+    } finally {
+      if (mounted && identical(_generateJob, job)) {
+        setState(() {
+          _generateJob = null;
+          _generateProgress = null;
         });
       }
-      _portfolio.sort((a, b) => b.ev.compareTo(a.ev));
-    });
+    }
   }
 
-  void _getCombinations(List<Leg> source, int k, int start, List<Leg> current, Function(List<Leg>) onFound) {
-    if (current.length == k) {
-      onFound(current);
-      return;
-    }
-    for (int i = start; i < source.length; i++) {
-      current.add(source[i]);
-      _getCombinations(source, k, i + 1, current, onFound);
-      current.removeLast();
+  Future<void> _runSweep() async {
+    _sweepJob?.cancel(); // A new sweep supersedes the old one
+    final clock = Stopwatch()..start();
+    final job = _engine.sweep(
+      _legs, _minLegs.toInt(), _maxLegs.toInt(), _sgpMode,
+      bankroll: _bankroll,
+      kellyFractions: List.generate(10, (i) => 0.1 * (i + 1)),
+      boostPcts: List.generate(10, (i) => 5.0 * i),
+      autoFillModes: const [true, false],
+      units: const [0.5, 1.0, 2.0, 3.0, 5.0].map((m) => _defaultUnit * m).toList(),
+    );
+    setState(() {
+      _sweepJob = job;
+      _sweepProgress = null;
+    });
+    job.progress.listen((progress) {
+      if (mounted && identical(_sweepJob, job)) setState(() => _sweepProgress = progress);
+    });
+
+    try {
+      List<Object> result = await job.result;
+      if (!mounted || !identical(_sweepJob, job)) return;
+      List<SweepRow> rows = result[0] as List<SweepRow>;
+      int comboCount = result[1] as int;
+      if (comboCount == 0) {
+        ScaffoldMessenger.of(context).showSnackBar(const SnackBar(content: Text("No valid combos. Check active legs and leg counts.")));
+        return;
+      }
+      rows.sort((a, b) => b.totalEv.compareTo(a.totalEv));
+      setState(() {
+        _sweepRows = rows;
+        _sweepComboCount = comboCount;
+        _lastEngineLatency = clock.elapsed;
+      });
+    } on JobCancelled {
+      // Superseded or cancelled: the previous sweep stays on screen.
+    } catch (e) {
+      if (!mounted || !identical(_sweepJob, job)) return;
+      ScaffoldMessenger.of(context).showSnackBar(SnackBar(content: Text("SWEEP FAILED: $e"), backgroundColor: Colors.red));
+    } finally {
+      if (mounted && identical(_sweepJob, job)) {
+        setState(() {
+          _sweepJob = null;
+          _sweepProgress = null;
+        });
+      }
     }
   }
 
-  void _runMonteCarlo() {
+  void _applySweepRow(SweepRow row) {
+    setState(() {
+      _autoFillKelly = row.autoFillKelly;
+      _correlationBoostPct = row.correlationBoostPct;
+      if (row.kellyFraction != null) _kellyFraction = row.kellyFraction!;
+      if (row.defaultUnit != null) _defaultUnit = row.defaultUnit!;
+    });
+    ScaffoldMessenger.of(context).showSnackBar(const SnackBar(content: Text("SETTINGS APPLIED. Re-run the generator.")));
+  }
+
+  void _runBacktest(List<ArchivedSlate> slates) {
+    _backtestSub?.cancel();
+    final profile = BacktestProfile(staking: _stakingProfile, minLegs: _minLegs.toInt(), maxLegs: _maxLegs.toInt(), sgpMode: _sgpMode);
+    setState(() {
+      _isBacktesting = true;
+      _backtestReport = BacktestReport.build([], _bankroll, slates.length);
+    });
+    _backtestSub = Backtester.run(slates, profile).listen(
+      (report) { if (mounted) setState(() => _backtestReport = report); },
+      onError: (e) {
+        if (!mounted) return;
+        setState(() => _isBacktesting = false);
+        ScaffoldMessenger.of(context).showSnackBar(SnackBar(content: Text("BACKTEST FAILED: $e"), backgroundColor: Colors.red));
+      },
+      onDone: () { if (mounted) setState(() => _isBacktesting = false); },
+    );
+  }
+
+  Future<void> _runMonteCarlo() async {
     List<GeneratedParlay> activeBets = _portfolio.where((p) => p.betPlaced).toList();
     if (activeBets.isEmpty) {
       ScaffoldMessenger.of(context).showSnackBar(const SnackBar(content: Text("No bets selected! Check 'BET?' in Portfolio.")));
       return;
     }
 
-    List<double> results = [];
-    Random rng = Random();
-    Map<String, double> uniqueLegProbs = {};
-    for (var p in activeBets) {
-      for (var l in p.legs) uniqueLegProbs[l.name] = l.myProb;
-    }
-
-    for (int i = 0; i < 1000; i++) {
-      double sessionProfit = 0;
-      Map<String, bool> outcomes = {};
-      uniqueLegProbs.forEach((key, prob) {
-        outcomes[key] = rng.nextDouble() < prob;
+    _simJob?.cancel();
+    final job = _engine.simulate(activeBets);
+    setState(() {
+      _simJob = job;
+      _simProgress = null;
+      _hasRunSim = false; // The previous run's numbers don't describe this one
+    });
+    job.progress.listen((progress) {
+      if (!mounted || !identical(_simJob, job)) return;
+      setState(() {
+        _simProgress = progress;
+        _applySimSummary(progress.partial as SimSummary, progress.total);
       });
+    });
 
-      for (var p in activeBets) {
-        bool won = p.legs.every((l) => outcomes[l.name] == true);
-        if (won) sessionProfit += p.potentialPayout; else sessionProfit -= p.myWager;
+    try {
+      SimSummary summary = await job.result;
+      if (!mounted || !identical(_simJob, job)) return;
+      setState(() => _applySimSummary(summary, summary.runs));
+    } on JobCancelled {
+      // Keep the partial numbers already shown; they stay labelled with their run count.
+    } catch (e) {
+      if (!mounted || !identical(_simJob, job)) return;
+      ScaffoldMessenger.of(context).showSnackBar(SnackBar(content: Text("SIMULATION FAILED: $e"), backgroundColor: Colors.red));
+    } finally {
+      if (mounted && identical(_simJob, job)) {
+        setState(() {
+          _simJob = null;
+          _simProgress = null;
+        });
       }
-      results.add(sessionProfit);
     }
+  }
 
-    setState(() {
-      _simAvgProfit = results.reduce((a, b) => a + b) / results.length;
-      _simBestCase = results.reduce(max);
-      _simWorstCase = results.reduce(min);
-      _simWinRate = (results.where((r) => r > 0).length / results.length) * 100;
-      _hasRunSim = true;
-    });
+  // Call inside setState.
+  void _applySimSummary(SimSummary summary, int totalRuns) {
+    _simRuns = summary.runs;
+    _simRunsTotal = totalRuns;
+    _simAvgProfit = summary.avgProfit;
+    _simBestCase = summary.bestCase;
+    _simWorstCase = summary.worstCase;
+    _simWinRate = summary.winRate;
+    _hasRunSim = true;
   }
 
   // --- UI ---
@@ -381,14 +1639,23 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
           ],
         ),
       ),
-      body: TabBarView(
-        controller: _tabController,
+      body: Column(
         children: [
-          _buildBuilderTab(),
-          _buildPortfolioTab(),
-          _buildScenarioTab(),
-          _buildStatsTab(),
-          _buildLedgerTab(),
+          if (_generateJob != null) _buildJobBanner("GENERATING", "combos", _generateProgress, _generateJob!.cancel, _generateBestLabel()),
+          if (_sweepJob != null) _buildJobBanner("SWEEPING", "combos", _sweepProgress, _sweepJob!.cancel, null),
+          if (_simJob != null) _buildJobBanner("SIMULATING", "runs", _simProgress, _simJob!.cancel, _simProgress?.best == null ? null : "BEST CASE \$${_simProgress!.best!.toStringAsFixed(0)}"),
+          Expanded(
+            child: TabBarView(
+              controller: _tabController,
+              children: [
+                _buildBuilderTab(),
+                _buildPortfolioTab(),
+                _buildScenarioTab(),
+                _buildStatsTab(),
+                _buildLedgerTab(),
+              ],
+            ),
+          ),
         ],
       ),
       floatingActionButton: _tabController.index == 0 
@@ -401,6 +1668,40 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
     );
   }
 
+  // --- JOB BANNER ---
+  String? _generateBestLabel() {
+    final progress = _generateProgress;
+    if (progress == null || progress.best == null) return null;
+    final preview = progress.partial as List<GeneratedParlay>;
+    return "BEST EV \$${progress.best!.toStringAsFixed(2)} (${preview.first.legsLabel})";
+  }
+
+  String _formatEta(Duration? eta) {
+    if (eta == null) return "--:--";
+    int secs = eta.inSeconds;
+    return "${secs ~/ 60}:${(secs % 60).toString().padLeft(2, '0')}";
+  }
+
+  Widget _buildJobBanner(String label, String unit, JobProgress? progress, VoidCallback onCancel, String? bestLabel) {
+    String status = progress == null ? "STARTING..." : "${progress.processed}/${progress.total} $unit | ETA ${_formatEta(progress.eta)}";
+    return Container(
+      color: const Color(0xFF1A1C24),
+      padding: const EdgeInsets.fromLTRB(16, 4, 8, 8),
+      child: Column(
+        crossAxisAlignment: CrossAxisAlignment.start,
+        children: [
+          Row(
+            children: [
+              Expanded(child: Text("$label: $status${bestLabel == null ? '' : '\n$bestLabel'}", maxLines: 2, overflow: TextOverflow.ellipsis, style: const TextStyle(color: Colors.white70, fontSize: 11))),
+              TextButton(onPressed: onCancel, child: const Text("CANCEL", style: TextStyle(color: Colors.red))),
+            ],
+          ),
+          LinearProgressIndicator(value: progress?.fraction, color: const Color(0xFF00FF41), backgroundColor: Colors.white10),
+        ],
+      ),
+    );
+  }
+
   // --- SCENARIO TAB ---
   Widget _buildScenarioTab() {
     List<GeneratedParlay> activeBets = _portfolio.where((p) => p.betPlaced).toList();
@@ -533,7 +1834,7 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
             child: ElevatedButton.icon(
               style: ElevatedButton.styleFrom(backgroundColor: const Color(0xFF1A1C24), foregroundColor: const Color(0xFF00FF41), side: const BorderSide(color: Color(0xFF00FF41)), padding: const EdgeInsets.all(16)),
               onPressed: () { _generateParlays(); _tabController.animateTo(1); },
-              icon: const Icon(Icons.memory), label: const Text("RUN GENERATOR ENGINE"),
+              icon: const Icon(Icons.memory), label: Text(_generateJob != null ? "RE-RUN ENGINE (SUPERSEDES CURRENT RUN)" : "RUN GENERATOR ENGINE"),
             ),
           ),
         ),
@@ -611,46 +1912,154 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
   }
 
   // --- LEDGER TAB ---
+  Future<void> _refreshLedger() async {
+    if (!_ledger.isOpen) return;
+    final season = await _ledger.totals(sinceKey: BetLedger.seasonStartKey(DateTime.now()));
+    final daily = await _ledger.buckets();
+    final weekly = await _ledger.buckets(weekly: true, limit: 8);
+    final exposure = await _ledger.exposure();
+    if (!mounted) return;
+    setState(() {
+      _ledgerSeason = season;
+      _ledgerDaily = daily;
+      _ledgerWeekly = weekly;
+      _ledgerExposure = exposure;
+    });
+  }
+
+  Future<void> _logPlacedBets() async {
+    List<GeneratedParlay> unlogged = _portfolio.where((p) => p.betPlaced && p.ledgerId == null).toList();
+    if (unlogged.isEmpty) {
+      ScaffoldMessenger.of(context).showSnackBar(const SnackBar(content: Text("Nothing new to log. Check 'BET?' in Portfolio.")));
+      return;
+    }
+    try {
+      List<int> ids = await _ledger.logBets(unlogged);
+      for (int i = 0; i < unlogged.length; i++) unlogged[i].ledgerId = ids[i];
+      await _refreshLedger();
+      if (!mounted) return;
+      ScaffoldMessenger.of(context).showSnackBar(SnackBar(content: Text("LOGGED ${ids.length} BETS TO LEDGER")));
+    } catch (e) {
+      if (!mounted) return;
+      ScaffoldMessenger.of(context).showSnackBar(SnackBar(content: Text("LEDGER WRITE FAILED: $e"), backgroundColor: Colors.red));
+    }
+  }
+
+  // Results file: one "Leg id,WIN|LOSS" or "Game date,Leg name,WIN|LOSS" (or tab-separated)
+  // line per leg. Ids settle wherever they are pending; names only settle on that game date.
+  List<LegResult> _parseResults(String text) {
+    final datePattern = RegExp(r'^\d{4}-\d{2}-\d{2}$');
+    List<LegResult> results = [];
+    for (String line in text.split('\n')) {
+      line = line.trim(); if (line.isEmpty || line.startsWith("Date")) continue;
+      String sep = line.contains('\t') ? '\t' : ',';
+      int first = line.indexOf(sep), last = line.lastIndexOf(sep);
+      if (last <= 0) continue;
+      String head = line.substring(0, first).trim();
+      String? day = first < last && datePattern.hasMatch(head) ? head : null;
+      String leg = line.substring(day == null ? 0 : first + 1, last).trim();
+      String result = line.substring(last + 1).trim().toUpperCase();
+      if (leg.isEmpty) continue;
+      if (['WIN', 'W', '1', 'TRUE'].contains(result)) results.add(LegResult(key: leg, eventDate: day, won: true));
+      else if (['LOSS', 'L', '0', 'FALSE'].contains(result)) results.add(LegResult(key: leg, eventDate: day, won: false));
+    }
+    return results;
+  }
+
+  void _showSettleDialog() {
+    TextEditingController controller = TextEditingController();
+    showDialog(context: context, builder: (ctx) => AlertDialog(scrollable: true, backgroundColor: const Color(0xFF1A1C24), title: const Text("SETTLE RESULTS", style: TextStyle(color: Color(0xFF00FF41))), content: Column(mainAxisSize: MainAxisSize.min, crossAxisAlignment: CrossAxisAlignment.start, children: [const Text("Paste results file (Game date,Leg Name,WIN or LOSS, or Leg ID,WIN or LOSS):", style: TextStyle(color: Colors.white70, fontSize: 12)), TextField(controller: controller, maxLines: 10, style: const TextStyle(fontFamily: 'Courier', fontSize: 11, color: Colors.white), decoration: const InputDecoration(filled: true, fillColor: Colors.black, hintText: "2024-09-08,Example Team A,WIN"))]), actions: [TextButton(child: const Text("SETTLE", style: TextStyle(color: Color(0xFF00FF41))), onPressed: () async {
+              List<LegResult> results = _parseResults(controller.text);
+              if (results.isEmpty) { ScaffoldMessenger.of(context).showSnackBar(const SnackBar(content: Text("NO VALID RESULTS FOUND."))); return; }
+              Navigator.pop(ctx);
+              try {
+                LedgerSettlement outcome = await _ledger.settleLegs(results);
+                await _refreshLedger();
+                if (!mounted) return;
+                int missed = outcome.unmatched.length;
+                String detail = missed == 0 ? "" : " | $missed LINES MATCHED NOTHING (${outcome.unmatched.take(3).map((r) => r.key).join(', ')}${missed > 3 ? ', ...' : ''})";
+                ScaffoldMessenger.of(context).showSnackBar(SnackBar(content: Text("SETTLED ${outcome.legsGraded} LEGS -> ${outcome.betsClosed} BETS CLOSED$detail"), backgroundColor: missed == 0 ? null : Colors.orange));
+              } catch (e) {
+                if (!mounted) return;
+                ScaffoldMessenger.of(context).showSnackBar(SnackBar(content: Text("SETTLEMENT FAILED: $e"), backgroundColor: Colors.red));
+              }
+            })]));
+  }
+
   Widget _buildLedgerTab() {
-    List<GeneratedParlay> placedBets = _portfolio.where((p) => p.betPlaced).toList();
-    if (placedBets.isEmpty) return const Center(child: Text("NO BETS PLACED.\nMark checkbox in Portfolio.", style: TextStyle(color: Colors.grey)));
-    
-    double totalWagered = placedBets.fold(0, (sum, p) => sum + p.myWager);
-    double totalPotentialProfit = placedBets.fold(0, (sum, p) => sum + p.potentialPayout);
+    List<GeneratedParlay> unlogged = _portfolio.where((p) => p.betPlaced && p.ledgerId == null).toList();
+    final season = _ledgerSeason;
 
     return SingleChildScrollView(
       padding: const EdgeInsets.all(16),
       child: Column(
+        crossAxisAlignment: CrossAxisAlignment.start,
         children: [
+          Text("SEASON TO DATE (since ${BetLedger.seasonStartKey(DateTime.now())})", style: const TextStyle(color: Colors.white, fontWeight: FontWeight.bold)),
+          const SizedBox(height: 10),
           Container(
             padding: const EdgeInsets.all(16),
             decoration: BoxDecoration(color: const Color(0xFF1A1C24), border: Border.all(color: Colors.white24), borderRadius: BorderRadius.circular(8)),
             child: Row(
               mainAxisAlignment: MainAxisAlignment.spaceAround,
               children: [
-                Column(children: [const Text("TOTAL RISK", style: TextStyle(color: Colors.grey, fontSize: 10)), Text("\$${totalWagered.toStringAsFixed(2)}", style: const TextStyle(color: Colors.white, fontSize: 18, fontWeight: FontWeight.bold))]),
-                Column(children: [const Text("MAX PROFIT", style: TextStyle(color: Colors.grey, fontSize: 10)), Text("\$${totalPotentialProfit.toStringAsFixed(2)}", style: const TextStyle(color: Color(0xFF00FF41), fontSize: 18, fontWeight: FontWeight.bold))]),
+                Column(children: [const Text("P&L", style: TextStyle(color: Colors.grey, fontSize: 10)), Text("\$${season.pnl.toStringAsFixed(2)}", style: TextStyle(color: season.pnl >= 0 ? const Color(0xFF00FF41) : Colors.red, fontSize: 18, fontWeight: FontWeight.bold))]),
+                Column(children: [const Text("ROI", style: TextStyle(color: Colors.grey, fontSize: 10)), Text("${season.roi.toStringAsFixed(1)}%", style: const TextStyle(color: Colors.white, fontSize: 18, fontWeight: FontWeight.bold))]),
+                Column(children: [const Text("OPEN RISK", style: TextStyle(color: Colors.grey, fontSize: 10)), Text("\$${season.openRisk.toStringAsFixed(0)}", style: const TextStyle(color: Colors.white, fontSize: 18, fontWeight: FontWeight.bold))]),
+                Column(children: [const Text("BETS", style: TextStyle(color: Colors.grey, fontSize: 10)), Text("${season.settled}/${season.bets}", style: const TextStyle(color: Colors.white, fontSize: 18, fontWeight: FontWeight.bold))]),
               ],
             ),
           ),
-          const SizedBox(height: 20),
-          ListView.builder(
-            shrinkWrap: true, physics: const NeverScrollableScrollPhysics(), itemCount: placedBets.length,
-            itemBuilder: (ctx, i) {
-               final bet = placedBets[i];
-               return ListTile(
-                 contentPadding: EdgeInsets.zero,
-                 title: Text(bet.legsLabel, maxLines: 1, overflow: TextOverflow.ellipsis, style: const TextStyle(color: Colors.white, fontSize: 12)),
-                 subtitle: Text("Odds: ${bet.oddsDisplay}", style: const TextStyle(color: Colors.grey, fontSize: 10)),
-                 trailing: Text("\$${bet.myWager.toStringAsFixed(0)}", style: const TextStyle(color: Color(0xFF00FF41))),
-               );
-            }
-          )
+          const SizedBox(height: 10),
+          Row(children: [
+            Expanded(child: ElevatedButton(style: ElevatedButton.styleFrom(backgroundColor: const Color(0xFF00FF41), foregroundColor: Colors.black), onPressed: _logPlacedBets, child: Text("LOG ${unlogged.length} NEW BETS"))),
+            const SizedBox(width: 10),
+            Expanded(child: ElevatedButton(style: ElevatedButton.styleFrom(backgroundColor: const Color(0xFF1A1C24), foregroundColor: const Color(0xFF00FF41), side: const BorderSide(color: Color(0xFF00FF41))), onPressed: _showSettleDialog, child: const Text("SETTLE RESULTS"))),
+          ]),
+          if (unlogged.isNotEmpty) ...[
+            const SizedBox(height: 20),
+            const Text("UNLOGGED PICKS", style: TextStyle(color: Colors.grey, fontSize: 12)),
+            ListView.builder(
+              shrinkWrap: true, physics: const NeverScrollableScrollPhysics(), itemCount: unlogged.length,
+              itemBuilder: (ctx, i) {
+                 final bet = unlogged[i];
+                 return ListTile(
+                   contentPadding: EdgeInsets.zero,
+                   title: Text(bet.legsLabel, maxLines: 1, overflow: TextOverflow.ellipsis, style: const TextStyle(color: Colors.white, fontSize: 12)),
+                   subtitle: Text("Odds: ${bet.oddsDisplay}", style: const TextStyle(color: Colors.grey, fontSize: 10)),
+                   trailing: Text("\$${bet.myWager.toStringAsFixed(0)}", style: const TextStyle(color: Color(0xFF00FF41))),
+                 );
+              }
+            ),
+          ],
+          const Divider(color: Colors.white24, height: 30),
+          const Text("DAILY P&L", style: TextStyle(color: Colors.grey, fontSize: 12)),
+          ..._ledgerDaily.map(_buildLedgerBucketRow),
+          const Divider(color: Colors.white24, height: 30),
+          const Text("WEEKLY P&L (week of)", style: TextStyle(color: Colors.grey, fontSize: 12)),
+          ..._ledgerWeekly.map(_buildLedgerBucketRow),
+          const Divider(color: Colors.white24, height: 30),
+          const Text("OPEN EXPOSURE PER LEG", style: TextStyle(color: Colors.grey, fontSize: 12)),
+          ..._ledgerExposure.map((e) => ListTile(
+            contentPadding: EdgeInsets.zero, dense: true,
+            title: Text(e.legName, maxLines: 1, overflow: TextOverflow.ellipsis, style: const TextStyle(color: Colors.white, fontSize: 12)),
+            subtitle: Text("${e.openBets} open bets", style: const TextStyle(color: Colors.grey, fontSize: 10)),
+            trailing: Text("\$${e.openRisk.toStringAsFixed(0)}", style: const TextStyle(color: Colors.orangeAccent)),
+          )),
         ],
       ),
     );
   }
 
+  Widget _buildLedgerBucketRow(LedgerBucket b) {
+    return ListTile(
+      contentPadding: EdgeInsets.zero, dense: true,
+      title: Text(b.key, style: const TextStyle(color: Colors.white, fontSize: 12)),
+      subtitle: Text("${b.settled}/${b.bets} settled | Risk \$${b.wagered.toStringAsFixed(0)} | ROI ${b.roi.toStringAsFixed(1)}%", style: const TextStyle(color: Colors.grey, fontSize: 10)),
+      trailing: Text("\$${b.pnl.toStringAsFixed(2)}", style: TextStyle(color: b.pnl >= 0 ? const Color(0xFF00FF41) : Colors.red)),
+    );
+  }
+
   // --- STATS TAB ---
   Widget _buildStatsTab() {
     return SingleChildScrollView(
@@ -683,6 +2092,11 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
           ),
           const SizedBox(height: 20),
           if (_hasRunSim) ...[
+            Text(
+              "$_simRuns/$_simRunsTotal RUNS${_simRuns >= _simRunsTotal ? '' : _simJob != null ? ' | IN PROGRESS' : ' | PARTIAL (CANCELLED)'}",
+              style: TextStyle(color: _simRuns >= _simRunsTotal ? Colors.grey : Colors.orange, fontSize: 10),
+            ),
+            const SizedBox(height: 6),
             Row(children: [
                 _buildStatCard("AVG PROFIT", "\$${_simAvgProfit.toStringAsFixed(2)}", _simAvgProfit > 0 ? Colors.green : Colors.red),
                 const SizedBox(width: 10),
@@ -694,7 +2108,84 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
                 const SizedBox(width: 10),
                 _buildStatCard("WORST CASE", "\$${_simWorstCase.toStringAsFixed(0)}", Colors.red),
             ]),
-          ]
+          ],
+          const SizedBox(height: 30),
+          const Divider(color: Colors.white24),
+          const Text("BACKTEST (Archived Slates)", style: TextStyle(color: Colors.white, fontWeight: FontWeight.bold)),
+          const Text("Replays each slate with current settings, betting the top 10 +EV parlays.", style: TextStyle(color: Colors.grey, fontSize: 10)),
+          const SizedBox(height: 10),
+          SizedBox(
+            width: double.infinity,
+            child: ElevatedButton(
+              style: ElevatedButton.styleFrom(backgroundColor: const Color(0xFF1A1C24), foregroundColor: const Color(0xFF00FF41), side: const BorderSide(color: Color(0xFF00FF41))),
+              onPressed: _isBacktesting ? null : _showBacktestDialog,
+              child: Text(_isBacktesting ? "BACKTESTING ${_backtestReport?.days.length ?? 0}/${_backtestReport?.datesTotal ?? 0} DATES..." : "LOAD ARCHIVE & BACKTEST"),
+            ),
+          ),
+          if (_backtestReport != null && _backtestReport!.days.isNotEmpty) ...[
+            const SizedBox(height: 20),
+            Center(
+              child: Container(
+                height: 150, width: double.infinity,
+                decoration: BoxDecoration(color: const Color(0xFF1A1C24), border: Border.all(color: Colors.white10)),
+                child: CustomPaint(painter: BankrollPainter(_backtestReport!.bankrollPath)),
+              ),
+            ),
+            const SizedBox(height: 10),
+            Row(children: [
+                _buildStatCard("END BANKROLL", _backtestReport!.bust ? "BUST" : "\$${_backtestReport!.bankrollPath.last.toStringAsFixed(0)}", _backtestReport!.pnl >= 0 ? Colors.green : Colors.red),
+                const SizedBox(width: 10),
+                _buildStatCard("ROI", "${_backtestReport!.roi.toStringAsFixed(1)}%", Colors.blue),
+            ]),
+            const SizedBox(height: 10),
+            Row(children: [
+                _buildStatCard("MAX DRAWDOWN", "\$${_backtestReport!.maxDrawdown.toStringAsFixed(0)} (${_backtestReport!.maxDrawdownPct.toStringAsFixed(1)}%)", Colors.red),
+                const SizedBox(width: 10),
+                _buildStatCard("BETS / WIN%", "${_backtestReport!.bets} / ${_backtestReport!.winRate.toStringAsFixed(1)}%", Colors.white),
+            ]),
+          ],
+          const SizedBox(height: 30),
+          const Divider(color: Colors.white24),
+          const Text("PARAMETER SWEEP", style: TextStyle(color: Colors.white, fontWeight: FontWeight.bold)),
+          const Text("Prices the slate once, then stakes it across Kelly 0.1-1.0 x SGP Boost 0-45%, plus flat units of 0.5-5x the current unit. Tap a row to apply.", style: TextStyle(color: Colors.grey, fontSize: 10)),
+          const SizedBox(height: 10),
+          SizedBox(
+            width: double.infinity,
+            child: ElevatedButton(
+              style: ElevatedButton.styleFrom(backgroundColor: const Color(0xFF1A1C24), foregroundColor: const Color(0xFF00FF41), side: const BorderSide(color: Color(0xFF00FF41))),
+              onPressed: _runSweep,
+              child: Text(_sweepJob != null ? "RE-RUN SWEEP (SUPERSEDES CURRENT SWEEP)" : "RUN SWEEP (10 X 10)"),
+            ),
+          ),
+          if (_sweepRows.isNotEmpty) ...[
+            const SizedBox(height: 10),
+            Text("$_sweepComboCount combos priced once | ${_sweepRows.length} grid points", style: const TextStyle(color: Colors.grey, fontSize: 10)),
+            SingleChildScrollView(
+              scrollDirection: Axis.horizontal,
+              child: DataTable(
+                showCheckboxColumn: false, columnSpacing: 16, headingRowHeight: 32, dataRowMinHeight: 28, dataRowMaxHeight: 32,
+                headingTextStyle: const TextStyle(color: Colors.grey, fontSize: 10, fontWeight: FontWeight.bold),
+                dataTextStyle: const TextStyle(color: Colors.white, fontSize: 11),
+                columns: const [
+                  DataColumn(label: Text("STAKE")), DataColumn(label: Text("BOOST")), DataColumn(label: Text("BETS"), numeric: true),
+                  DataColumn(label: Text("RISK"), numeric: true), DataColumn(label: Text("EV"), numeric: true), DataColumn(label: Text("ROI"), numeric: true),
+                  DataColumn(label: Text("MAX BET"), numeric: true),
+                ],
+                rows: _sweepRows.map((r) => DataRow(
+                  onSelectChanged: (_) => _applySweepRow(r),
+                  cells: [
+                    DataCell(Text(r.autoFillKelly ? "Kelly ${r.kellyFraction!.toStringAsFixed(2)}" : "Flat \$${r.defaultUnit!.toStringAsFixed(0)}")),
+                    DataCell(Text("${r.correlationBoostPct.toStringAsFixed(0)}%")),
+                    DataCell(Text("${r.bets}")),
+                    DataCell(Text("\$${r.totalRisk.toStringAsFixed(0)}")),
+                    DataCell(Text("\$${r.totalEv.toStringAsFixed(2)}", style: TextStyle(color: r.totalEv >= 0 ? const Color(0xFF00FF41) : Colors.red))),
+                    DataCell(Text("${r.roi.toStringAsFixed(1)}%")),
+                    DataCell(Text("\$${r.maxWager.toStringAsFixed(0)}")),
+                  ],
+                )).toList(),
+              ),
+            ),
+          ],
         ],
       ),
     );
@@ -706,7 +2197,7 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
 
   // --- CSV / IMPORT ---
   void _showExportDialog() {
-    String header = "Name,Odds,Conf,Excl,Link,Active";
+    String header = "Name,Odds,Conf,Excl,Link,Active,Event";
     String body = _legs.map((l) => l.toCsvString()).join("\n");
     String fullCsv = "$header\n$body";
     showDialog(context: context, builder: (ctx) => AlertDialog(scrollable: true, backgroundColor: const Color(0xFF1A1C24), title: const Text("EXPORT CSV", style: TextStyle(color: Color(0xFF00FF41))), content: Column(mainAxisSize: MainAxisSize.min, children: [const Text("Copy this text and save as .csv:", style: TextStyle(color: Colors.white70)), Container(padding: const EdgeInsets.all(8), color: Colors.black, height: 150, child: SingleChildScrollView(child: SelectableText(fullCsv, style: const TextStyle(fontFamily: 'Courier', fontSize: 12, color: Colors.white))))])));
@@ -730,6 +2221,16 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
             })]));
   }
 
+  void _showBacktestDialog() {
+    TextEditingController controller = TextEditingController();
+    showDialog(context: context, builder: (ctx) => AlertDialog(scrollable: true, backgroundColor: const Color(0xFF1A1C24), title: const Text("BACKTEST ARCHIVE", style: TextStyle(color: Color(0xFF00FF41))), content: Column(mainAxisSize: MainAxisSize.min, crossAxisAlignment: CrossAxisAlignment.start, children: [const Text("Paste archived slates (Date,Name,Odds,Conf,Excl,Link,Result):", style: TextStyle(color: Colors.white70, fontSize: 12)), TextField(controller: controller, maxLines: 10, style: const TextStyle(fontFamily: 'Courier', fontSize: 11, color: Colors.white), decoration: const InputDecoration(filled: true, fillColor: Colors.black, hintText: "2024-09-08,Example Team A,-110,6,A,,WIN"))]), actions: [TextButton(child: const Text("RUN", style: TextStyle(color: Color(0xFF00FF41))), onPressed: () {
+              List<ArchivedSlate> slates = Backtester.parseArchive(controller.text);
+              if (slates.isEmpty) { ScaffoldMessenger.of(context).showSnackBar(const SnackBar(content: Text("NO VALID SLATES FOUND."))); return; }
+              Navigator.pop(ctx);
+              _runBacktest(slates);
+            })]));
+  }
+
   void _showAddLegDialog() {
     String name = ""; String odds = "-110"; String excl = ""; String link = ""; double conf = 5.0;
     showDialog(context: context, builder: (ctx) { return StatefulBuilder(builder: (context, setState) { return AlertDialog(scrollable: true, backgroundColor: const Color(0xFF1A1C24), title: const Text("ADD PROP", style: TextStyle(color: Color(0xFF00FF41))), content: Column(mainAxisSize: MainAxisSize.min, children: [TextField(decoration: const InputDecoration(labelText: "Leg Name"), style: const TextStyle(color: Colors.white), onChanged: (v) => name = v), const SizedBox(height: 10), TextField(decoration: const InputDecoration(labelText: "Odds"), style: const TextStyle(color: Colors.white), keyboardType: TextInputType.numberWithOptions(signed: true), onChanged: (v) => odds = v), const SizedBox(height: 10), Row(children: [Expanded(child: TextField(decoration: const InputDecoration(labelText: "Excl"), style: const TextStyle(color: Colors.white), onChanged: (v) => excl = v)), const SizedBox(width: 10), Expanded(child: TextField(decoration: const InputDecoration(labelText: "Link"), style: const TextStyle(color: Colors.white), onChanged: (v) => link = v))]), const SizedBox(height: 20), Row(mainAxisAlignment: MainAxisAlignment.spaceBetween, children: [const Text("Confidence:", style: TextStyle(color: Colors.grey)), Text("${conf.toInt()}/10", style: const TextStyle(color: Color(0xFF00FF41), fontWeight: FontWeight.bold))]), Slider(value: conf, min: 1, max: 10, divisions: 9, onChanged: (val) { setState(() => conf = val); })]), actions: [TextButton(onPressed: () => Navigator.pop(ctx), child: const Text("CANCEL", style: TextStyle(color: Colors.grey))), TextButton(child: const Text("ADD", style: TextStyle(color: Color(0xFF00FF41))), onPressed: () { this.setState(() { _legs.add(Leg(id: DateTime.now().toString(), name: name.isEmpty ? "New Leg" : name, oddsAmerican: double.tryParse(odds) ?? -110, exclGroup: excl, linkGroup: link, confidence: conf)); }); Navigator.pop(ctx); })]); }); });
@@ -757,7 +2258,7 @@ class _EngineHomeState extends State<EngineHome> with SingleTickerProviderStateM
                     SizedBox(width: double.infinity, child: ElevatedButton(style: ElevatedButton.styleFrom(backgroundColor: const Color(0xFF00FF41), foregroundColor: Colors.black), onPressed: _isFetching ? null : _fetchFanDuelOdds, child: _isFetching ? const CircularProgressIndicator(color: Colors.black) : const Text("PULL LIVE FANDUEL ODDS"))),
                     const Divider(color: Colors.white24, height: 30),
 
-                    _buildSettingHeader("Bankroll", "\$${_bankroll.toStringAsFixed(0)}"), Slider(value: _bankroll, min: 100, max: 10000, onChanged: (val) { setState(() => _bankroll = val); setSheetState(() {}); }), SwitchListTile(contentPadding: EdgeInsets.zero, title: const Text("Auto-Fill Kelly Stake", style: TextStyle(color: Colors.white)), activeColor: const Color(0xFF00FF41), value: _autoFillKelly, onChanged: (val) { setState(() => _autoFillKelly = val); setSheetState(() {}); }), if (!_autoFillKelly) ...[const Text("Default Unit Size (\$)", style: TextStyle(color: Colors.grey)), const SizedBox(height: 5), TextField(keyboardType: TextInputType.number, decoration: const InputDecoration(hintText: "e.g. 10.0"), style: const TextStyle(color: Colors.white), onChanged: (val) => _defaultUnit = double.tryParse(val) ?? 10.0), const SizedBox(height: 15)], _buildSettingHeader("Kelly Fraction", _kellyFraction.toStringAsFixed(2)), Slider(value: _kellyFraction, min: 0.1, max: 1.0, onChanged: (val) { setState(() => _kellyFraction = val); setSheetState(() {}); }), _buildSettingHeader("Min Legs", _minLegs.toInt().toString()), Slider(value: _minLegs, min: 2, max: 10, divisions: 8, onChanged: (val) { if (val <= _maxLegs) { setState(() => _minLegs = val); setSheetState(() {}); } }), _buildSettingHeader("Max Legs", _maxLegs.toInt().toString()), Slider(value: _maxLegs, min: 2, max: 15, divisions: 13, onChanged: (val) { if (val >= _minLegs) { setState(() => _maxLegs = val); setSheetState(() {}); } }), _buildSettingHeader("SGP Boost", "${_correlationBoostPct.toInt()}%"), Slider(value: _correlationBoostPct, min: 0, max: 50, onChanged: (val) { setState(() => _correlationBoostPct = val); setSheetState(() {}); }), SwitchListTile(contentPadding: EdgeInsets.zero, title: const Text("Enable SGP Logic", style: TextStyle(color: Colors.white)), activeColor: const Color(0xFF00FF41), value: _sgpMode, onChanged: (val) { setState(() => _sgpMode = val); setSheetState(() {}); }), const SizedBox(height: 40)]))); }); });
+                    _buildSettingHeader("Bankroll", "\$${_bankroll.toStringAsFixed(0)}"), Slider(value: _bankroll, min: 100, max: 10000, onChanged: (val) { setState(() => _bankroll = val); setSheetState(() {}); }), SwitchListTile(contentPadding: EdgeInsets.zero, title: const Text("Auto-Fill Kelly Stake", style: TextStyle(color: Colors.white)), activeColor: const Color(0xFF00FF41), value: _autoFillKelly, onChanged: (val) { setState(() => _autoFillKelly = val); setSheetState(() {}); }), if (!_autoFillKelly) ...[const Text("Default Unit Size (\$)", style: TextStyle(color: Colors.grey)), const SizedBox(height: 5), TextField(keyboardType: TextInputType.number, decoration: const InputDecoration(hintText: "e.g. 10.0"), style: const TextStyle(color: Colors.white), onChanged: (val) => _defaultUnit = double.tryParse(val) ?? 10.0), const SizedBox(height: 15)], _buildSettingHeader("Kelly Fraction", _kellyFraction.toStringAsFixed(2)), Slider(value: _kellyFraction, min: 0.1, max: 1.0, onChanged: (val) { setState(() => _kellyFraction = val); setSheetState(() {}); }), _buildSettingHeader("Min Legs", _minLegs.toInt().toString()), Slider(value: _minLegs, min: 2, max: 10, divisions: 8, onChanged: (val) { if (val <= _maxLegs) { setState(() => _minLegs = val); setSheetState(() {}); } }), _buildSettingHeader("Max Legs", _maxLegs.toInt().toString()), Slider(value: _maxLegs, min: 2, max: 15, divisions: 13, onChanged: (val) { if (val >= _minLegs) { setState(() => _maxLegs = val); setSheetState(() {}); } }), _buildSettingHeader("SGP Boost", "${_correlationBoostPct.toInt()}%"), Slider(value: _correlationBoostPct, min: 0, max: 50, onChanged: (val) { setState(() => _correlationBoostPct = val); setSheetState(() {}); }), SwitchListTile(contentPadding: EdgeInsets.zero, title: const Text("Enable SGP Logic", style: TextStyle(color: Colors.white)), activeColor: const Color(0xFF00FF41), value: _sgpMode, onChanged: (val) { setState(() => _sgpMode = val); setSheetState(() {}); }), const Divider(color: Colors.white24, height: 30), const Text("ENGINE", style: TextStyle(color: Colors.grey, fontSize: 12)), _buildSettingHeader("Startup (budget ${kStartupBudget.inMilliseconds}ms)", _startupTime == null ? "-" : "${_startupTime!.inMilliseconds}ms"), _buildSettingHeader(_engine.inProcess ? "Engine Warmup (in-process)" : "Worker Warmup", _engine.isWarm && _engine.warmupTime != null ? "${_engine.warmupTime!.inMilliseconds}ms" : "STARTING"), _buildSettingHeader("Last Engine Call", _lastEngineLatency == null ? "-" : "${_lastEngineLatency!.inMilliseconds}ms"), const SizedBox(height: 40)]))); }); });
   }
 
   Widget _buildSettingHeader(String title, String val) { return Row(mainAxisAlignment: MainAxisAlignment.spaceBetween, children: [Text(title, style: const TextStyle(color: Colors.grey)), Text(val, style: const TextStyle(color: Color(0xFF00FF41), fontWeight: FontWeight.bold))]); }
@@ -770,3 +2271,11 @@ class ScatterPainter extends CustomPainter {
   @override
   bool shouldRepaint(covariant CustomPainter oldDelegate) => true;
 }
+
+class BankrollPainter extends CustomPainter {
+  final List<double> path; BankrollPainter(this.path);
+  @override
+  void paint(Canvas canvas, Size size) { if (path.length < 2) return; double lo = path.reduce(min), hi = path.reduce(max); double span = (hi - lo) == 0 ? 1 : hi - lo; double baseY = size.height - ((path.first - lo) / span) * size.height; canvas.drawLine(Offset(0, baseY), Offset(size.width, baseY), Paint()..color = Colors.white24..strokeWidth = 1); final linePaint = Paint()..color = (path.last >= path.first ? const Color(0xFF00FF41) : Colors.redAccent)..strokeWidth = 2..style = PaintingStyle.stroke; final line = Path(); for (int i = 0; i < path.length; i++) { double x = (i / (path.length - 1)) * size.width; double y = size.height - ((path[i] - lo) / span) * size.height; if (i == 0) line.moveTo(x, y); else line.lineTo(x, y); } canvas.drawPath(line, linePaint); }
+  @override
+  bool shouldRepaint(covariant BankrollPainter oldDelegate) => oldDelegate.path != path;
+}